@@ -4,14 +4,28 @@ Streamlit PPT Summarizer & Image Assistant using Azure OpenAI with environment v
 Also extracts and incorporates PowerPoint notes.
 """
 
-from io import BytesIO
-from typing import List, Dict, Any
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import streamlit as st
-from pptx import Presentation
-from openai import AzureOpenAI
+from openai import (
+    AzureOpenAI, AsyncAzureOpenAI,
+    APIConnectionError, APIStatusError, BadRequestError, RateLimitError,
+)
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 from dotenv import load_dotenv
+from utils import extract_slide_data, dedup_deck, clip_text
 
 # Load environment variables from .env file if it exists
 load_dotenv()
@@ -24,173 +38,597 @@ AZURE_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2023-03-15-preview")
 CHAT_MODEL = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4o-mini")
 IMAGE_MODEL = os.getenv("AZURE_OPENAI_IMAGE_DEPLOYMENT_NAME", "dall-e-3")
+# Batch jobs need a Global Batch deployment, which is often separate from the chat one
+BATCH_MODEL = os.getenv("AZURE_OPENAI_BATCH_DEPLOYMENT_NAME", CHAT_MODEL)
+# Upper bound on in-flight chat requests, keeps bursts under the deployment's RPM limit
+MAX_CONCURRENCY = int(os.getenv("AZURE_OPENAI_MAX_CONCURRENCY", "16"))
+# DALL·E deployments have a much tighter RPM limit than chat
+IMAGE_CONCURRENCY = int(os.getenv("AZURE_OPENAI_IMAGE_CONCURRENCY", "3"))
+# Slides packed into one summary prompt; beyond ~8 the per-call latency starts to dominate
+SLIDE_BATCH_SIZE = int(os.getenv("SLIDE_BATCH_SIZE", "6"))
+# response_format={"type": "json_object"} is only accepted from 2023-12-01-preview onwards, and only
+# by models that support it; set AZURE_OPENAI_JSON_MODE=false for older models (e.g. in batch mode)
+JSON_MODE = (os.getenv("AZURE_OPENAI_JSON_MODE", "True").lower() == "true"
+             and API_VERSION >= "2023-12-01-preview")
+# Attempts per LLM call; retries are handled by _backoff_delay rather than the SDK
+MAX_ATTEMPTS = 5
+# The Batch API is available from 2024-07-01-preview onwards
+BATCH_JOB_API = API_VERSION >= "2024-07-01-preview"
+BATCH_JOB_POLL_SECONDS = 15
+# Per-slide prompts carry at most this much slide text; the deck summary gets all of it
+SLIDE_PROMPT_CHARS = 1500
+# Chat replies kept in memory, so unchanged prompts are not sent again
+LLM_CACHE_MAX_ENTRIES = 1024
+# A failed deployments lookup is kept this long, so every rerun in between shows the error
+DEPLOYMENTS_ERROR_TTL = 30
+# Longest the page waits for the background smoke test before giving up
+SMOKE_TEST_TIMEOUT = 30
 
 # Add debug option to show available deployments
 DEBUG_MODE = os.getenv("DEBUG_MODE", "False").lower() == "true"
 
-# Smoke test: verify key+endpoint
-@st.cache_data(show_spinner=False)
-def smoke_test():
+# Connection pool sizing for the SDK clients; timeout matches the openai SDK default
+HTTPX_LIMITS = httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=8)
+HTTPX_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+
+# Keep-alive session for the deployments endpoint, shared across reruns
+@st.cache_resource(show_spinner=False)
+def get_session() -> requests.Session:
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504],
+                  raise_on_status=False)
+    session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry))
+    return session
+
+def _fetch_deployments(session: requests.Session) -> List[Dict[str, Any]]:
+    """GET the deployments list; raises requests.HTTPError on a non-200 reply"""
     # Remove trailing slash if present
     endpoint = AZURE_ENDPOINT.rstrip('/') if AZURE_ENDPOINT else ""
     url = f"{endpoint}/openai/deployments?api-version={API_VERSION}"
     
+    resp = session.get(url, headers={"api-key": AZURE_API_KEY}, timeout=(5, 15))
+    if resp.status_code != 200:
+        raise requests.HTTPError(f"[{resp.status_code}]: {resp.text}", response=resp)
+    return resp.json().get("data", [])
+
+@st.cache_resource(show_spinner=False)
+def get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    return concurrent.futures.ThreadPoolExecutor(max_workers=2)
+
+# One lookup every 5 minutes serves the smoke test, the sidebar and every error handler.
+# It runs in the background from page load, so the round-trip overlaps rendering and upload.
+# The thread gets the session up front and never touches st.*.
+@st.cache_resource(ttl=300, show_spinner=False)
+def deployments_future() -> concurrent.futures.Future:
+    return get_executor().submit(_fetch_deployments, get_session())
+
+def _cached_deployments(timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Result of the shared lookup; raises concurrent.futures.TimeoutError if not ready in time"""
+    future = deployments_future()
+    try:
+        return future.result(timeout=timeout)
+    except Exception:
+        # A failed lookup stays cached for DEPLOYMENTS_ERROR_TTL so it can't pass on the next rerun;
+        # after that the next call drops it and a fresh lookup is submitted. One in flight is left running.
+        if future.done():
+            if not hasattr(future, "failed_at"):
+                future.failed_at = time.monotonic()
+            elif time.monotonic() - future.failed_at > DEPLOYMENTS_ERROR_TTL:
+                deployments_future.clear()
+        raise
+
+# Smoke test: verify key+endpoint. The lookup was started at page load, so usually little is left to wait.
+def smoke_test():
     if not AZURE_API_KEY or not AZURE_ENDPOINT:
         st.error("🚨 Missing API key or endpoint. Please set environment variables.")
         st.stop()
         
     try:
-        resp = requests.get(url, headers={"api-key": AZURE_API_KEY})
-        if resp.status_code != 200:
-            st.error(f"🚨 Endpoint test failed [{resp.status_code}]: {resp.text}")
-            st.stop()
-        return resp.json().get("data", [])
+        with st.spinner("⏳ Checking connection to Azure OpenAI…"):
+            return _cached_deployments(timeout=SMOKE_TEST_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        st.error(f"🚨 Connection test timed out after {SMOKE_TEST_TIMEOUT}s.")
+        st.stop()
+    except requests.HTTPError as e:
+        st.error(f"🚨 Endpoint test failed [{e.response.status_code}]: {e.response.text}")
+        st.stop()
     except Exception as e:
         st.error(f"🚨 Connection test failed: {e}")
         st.stop()
 
-# Initialize AzureOpenAI client
+# Initialize AzureOpenAI client once per process, with a pooled HTTP client reused by every call
+@st.cache_resource(show_spinner=False)
 def get_client():
     return AzureOpenAI(
         api_key=AZURE_API_KEY,
         azure_endpoint=AZURE_ENDPOINT,
         api_version=API_VERSION,
+        http_client=httpx.Client(limits=HTTPX_LIMITS, timeout=HTTPX_TIMEOUT),
+        max_retries=0,
+    )
+
+# Async client for concurrent calls. Created per event loop (i.e. per asyncio.run)
+# because its connection pool is bound to the loop that opened it.
+def get_async_client():
+    return AsyncAzureOpenAI(
+        api_key=AZURE_API_KEY,
+        azure_endpoint=AZURE_ENDPOINT,
+        api_version=API_VERSION,
+        http_client=httpx.AsyncClient(limits=HTTPX_LIMITS, timeout=HTTPX_TIMEOUT),
+        max_retries=0,
     )
 
 # ────────────────────────────────────────────────
 # 💡 Helper functions
 # ────────────────────────────────────────────────
-def extract_slide_data(ppt_io: BytesIO) -> List[Dict[str, Any]]:
-    """Extract both slide text and notes from PowerPoint"""
-    prs = Presentation(ppt_io)
-    slides_data = []
-    
-    for i, slide in enumerate(prs.slides, 1):
-        # Extract text from shapes
-        slide_text = []
-        for shape in slide.shapes:
-            if hasattr(shape, "text") and shape.text.strip():
-                slide_text.append(shape.text)
-        
-        # Extract notes
-        notes_text = ""
-        if hasattr(slide, "notes_slide") and slide.notes_slide:
-            for shape in slide.notes_slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    notes_text += shape.text + "\n"
-        
-        slides_data.append({
-            "slide_number": i,
-            "slide_text": "\n".join(slide_text),
-            "notes_text": notes_text.strip(),
-            "has_notes": bool(notes_text.strip())
-        })
+def _backoff_delay(e: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying after e, or None if e is not worth retrying"""
+    if isinstance(e, RateLimitError):
+        # Azure tells us how long the quota window needs; fall back to exponential backoff
+        headers = e.response.headers
+        try:
+            if retry_after_ms := headers.get("retry-after-ms"):
+                return min(float(retry_after_ms) / 1000, 60)
+            if retry_after := headers.get("retry-after"):
+                return min(float(retry_after), 60)
+        except ValueError:
+            pass
+        return min(2 ** attempt + random.random(), 30)
+    # Timeouts, dropped connections and 5xx are usually short-lived
+    if isinstance(e, APIConnectionError) or (isinstance(e, APIStatusError) and e.status_code >= 500):
+        return min(2 ** attempt + random.random(), 8)
+    return None
+
+
+def _chat_body(system: str, user: str, temperature: float = 0.3, json_mode: bool = False,
+               model: str = CHAT_MODEL) -> Dict[str, Any]:
+    """Chat completion request body, shared by live calls and batch jobs"""
+    body = {
+        "model": model,
+        "messages": [{"role": "system", "content": system}, {"role": "user", "content": user}],
+        "temperature": temperature,
+    }
+    if json_mode and JSON_MODE:
+        body["response_format"] = {"type": "json_object"}
+    return body
+
+
+# Shared by every session in the process, and sessions run on separate threads, hence the lock.
+# Errors and empty replies are never stored.
+@st.cache_resource(show_spinner=False)
+def get_llm_cache() -> Dict[str, Any]:
+    return {"replies": {}, "hits": 0, "misses": 0, "lock": threading.Lock()}
+
+
+def _cache_key(body: Dict[str, Any]) -> Optional[str]:
+    """Cache key for a request body, or None if its reply is sampled (temperature > 0) and shouldn't be reused"""
+    if body["temperature"] > 0:
+        return None
+    return hashlib.blake2b(json.dumps(body, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def _cached_reply(key: Optional[str]) -> Optional[str]:
+    if key is None:
+        return None
+    cache = get_llm_cache()
+    with cache["lock"]:
+        reply = cache["replies"].get(key)
+        if reply is None:
+            cache["misses"] += 1
+        else:
+            cache["hits"] += 1
+    return reply
+
+
+def _store_reply(key: Optional[str], reply: str) -> None:
+    if key is None or not reply:
+        return
+    cache = get_llm_cache()
+    with cache["lock"]:
+        replies = cache["replies"]
+        replies[key] = reply
+        if len(replies) > LLM_CACHE_MAX_ENTRIES:
+            # Dicts keep insertion order, so this drops the oldest reply
+            del replies[next(iter(replies))]
+
+
+async def achat(client: AsyncAzureOpenAI, system: str, user: str, temperature: float = 0.3,
+                json_mode: bool = False) -> str:
+    """Send one chat completion; async so many requests can be in flight at once"""
+    body = _chat_body(system, user, temperature, json_mode)
+    key = _cache_key(body)
+    if (cached := _cached_reply(key)) is not None:
+        return cached
     
-    return slides_data
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            resp = await client.chat.completions.create(**body)
+            reply = resp.choices[0].message.content.strip()
+            _store_reply(key, reply)
+            return reply
+        except BadRequestError as e:
+            # Models without JSON mode answer 400; the prompt still asks for JSON, so retry without it
+            if "response_format" in body and "response_format" in str(e):
+                return await achat(client, system, user, temperature, json_mode=False)
+            return _report_chat_error(e)
+        except Exception as e:
+            delay = _backoff_delay(e, attempt)
+            if delay is None or attempt == MAX_ATTEMPTS - 1:
+                return _report_chat_error(e)
+            await asyncio.sleep(delay)
 
 
-def chat(system: str, user: str, temperature: float = 0.3) -> str:
+def chat_stream(system: str, user: str, temperature: float = 0.3) -> Iterator[str]:
+    """Synchronous chat completion that yields the reply as it is generated, for st.write_stream"""
+    body = _chat_body(system, user, temperature)
+    key = _cache_key(body)
+    if (cached := _cached_reply(key)) is not None:
+        yield cached
+        return
+    
     client = get_client()
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            stream = client.chat.completions.create(**body, stream=True)
+            break
+        except Exception as e:
+            delay = _backoff_delay(e, attempt)
+            if delay is None or attempt == MAX_ATTEMPTS - 1:
+                yield _report_chat_error(e)
+                return
+            time.sleep(delay)
+    
+    parts = []
     try:
-        resp = client.chat.completions.create(
-            model=CHAT_MODEL,
-            messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
-            temperature=temperature,
-        )
-        return resp.choices[0].message.content.strip()
+        for chunk in stream:
+            # Azure sends chunks without choices (e.g. content filter results)
+            if chunk.choices and (delta := chunk.choices[0].delta.content):
+                parts.append(delta)
+                yield delta
     except Exception as e:
-        st.error(f"Chat API error: {str(e)}")
-        
-        # Check if it's a deployment not found error
-        if "DeploymentNotFound" in str(e):
-            deployments = list_deployments()
-            if deployments:
-                deployment_names = [d['id'] for d in deployments]
-                st.warning(f"Available chat deployments: {', '.join(deployment_names)}")
-                st.info(f"Update your AZURE_OPENAI_DEPLOYMENT_NAME environment variable to use one of these.")
-        
-        return f"Error: {str(e)}"
+        yield _report_chat_error(e)
+        return
+    _store_reply(key, "".join(parts).strip())
+
+
+def _report_chat_error(e: Exception) -> str:
+    st.error(f"Chat API error: {str(e)}")
+    
+    # Check if it's a deployment not found error
+    if "DeploymentNotFound" in str(e):
+        deployments = list_deployments()
+        if deployments:
+            deployment_names = [d['id'] for d in deployments]
+            st.warning(f"Available chat deployments: {', '.join(deployment_names)}")
+            st.info(f"Update your AZURE_OPENAI_DEPLOYMENT_NAME environment variable to use one of these.")
+    
+    return f"Error: {str(e)}"
+
+
+IMAGE_PROMPT_SYSTEM = "Craft a vivid, photo-realistic DALL·E-3 prompt (16:9, minimal text). Return only the prompt."
 
 
 def dalle(prompt: str) -> str:
     client = get_client()
-    try:
-        out = client.images.generate(
-            model=IMAGE_MODEL,
-            prompt=prompt,
-            n=1,
-            size="1024x1024",
-        )
-        return out.data[0].url
-    except Exception as e:
-        st.error(f"Image generation failed: {e}")
-        
-        # Check if it's a deployment not found error
-        if "DeploymentNotFound" in str(e) or "Resource not found" in str(e):
-            deployments = list_deployments()
-            if deployments:
-                # Filter for likely image models
-                image_deployments = [d['id'] for d in deployments 
-                                     if 'dall' in d.get('model', '').lower()]
-                
-                if image_deployments:
-                    st.warning(f"Available image deployments: {', '.join(image_deployments)}")
-                    st.info(f"Update your AZURE_OPENAI_IMAGE_DEPLOYMENT_NAME environment variable to use one of these.")
-                else:
-                    st.warning("No DALL-E deployments found. You may need to create one in Azure OpenAI Studio.")
-        
-        return None
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            out = client.images.generate(
+                model=IMAGE_MODEL,
+                prompt=prompt,
+                n=1,
+                size="1024x1024",
+            )
+            return out.data[0].url
+        except Exception as e:
+            delay = _backoff_delay(e, attempt)
+            if delay is None or attempt == MAX_ATTEMPTS - 1:
+                return _report_image_error(e)
+            time.sleep(delay)
+
+
+async def dalle_async(client: AsyncAzureOpenAI, prompt: str) -> Optional[str]:
+    """Async counterpart of dalle()"""
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            out = await client.images.generate(
+                model=IMAGE_MODEL,
+                prompt=prompt,
+                n=1,
+                size="1024x1024",
+            )
+            return out.data[0].url
+        except Exception as e:
+            delay = _backoff_delay(e, attempt)
+            if delay is None or attempt == MAX_ATTEMPTS - 1:
+                return _report_image_error(e)
+            await asyncio.sleep(delay)
+
+
+async def gen_all(summaries: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """Craft a prompt and render an image for every slide summary, a few images at a time"""
+    chat_sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    image_sem = asyncio.Semaphore(IMAGE_CONCURRENCY)
+    async with get_async_client() as client:
+        async def one(summary: str) -> Tuple[str, Optional[str]]:
+            # A slide whose summary failed has nothing to illustrate; its error is already shown
+            if summary.startswith("Error:"):
+                return summary, None
+            async with chat_sem:
+                prompt = await achat(client, IMAGE_PROMPT_SYSTEM, f"Slide summary: {summary}", temperature=0.7)
+            # A failed prompt is already reported; don't spend scarce image RPM rendering the error text
+            if prompt.startswith("Error:"):
+                return prompt, None
+            async with image_sem:
+                return prompt, await dalle_async(client, prompt)
+
+        return await asyncio.gather(*(one(summary) for summary in summaries))
+
+
+def _report_image_error(e: Exception) -> None:
+    st.error(f"Image generation failed: {e}")
+    
+    # Check if it's a deployment not found error
+    if "DeploymentNotFound" in str(e) or "Resource not found" in str(e):
+        deployments = list_deployments()
+        if deployments:
+            # Filter for likely image models
+            image_deployments = [d['id'] for d in deployments 
+                                 if 'dall' in d.get('model', '').lower()]
+            
+            if image_deployments:
+                st.warning(f"Available image deployments: {', '.join(image_deployments)}")
+                st.info(f"Update your AZURE_OPENAI_IMAGE_DEPLOYMENT_NAME environment variable to use one of these.")
+            else:
+                st.warning("No DALL-E deployments found. You may need to create one in Azure OpenAI Studio.")
+    
+    return None
 
 
 def list_deployments():
     """List all available deployments"""
-    endpoint = AZURE_ENDPOINT.rstrip('/') if AZURE_ENDPOINT else ""
-    url = f"{endpoint}/openai/deployments?api-version={API_VERSION}"
-    
+    # Bounded: this is also reached from error handlers running on the event loop
     try:
-        resp = requests.get(url, headers={"api-key": AZURE_API_KEY})
-        if resp.status_code == 200:
-            return resp.json().get("data", [])
-        else:
-            st.error(f"Failed to list deployments: {resp.status_code} - {resp.text}")
-            return []
+        return _cached_deployments(timeout=5)
+    except concurrent.futures.TimeoutError:
+        st.warning("Deployments lookup is still running; try again shortly.")
+        return []
+    except requests.HTTPError as e:
+        st.error(f"Failed to list deployments: {e.response.status_code} - {e.response.text}")
+        return []
     except Exception as e:
         st.error(f"Error listing deployments: {str(e)}")
         return []
 
 
-@st.cache_data(show_spinner=False)
+def _chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+DECK_PURPOSES = ("inform", "persuade", "educate", "report", "pitch")
+
+DECK_SYSTEM_PROMPT = (
+    "You are an expert presentation analyst. Use insights from the presenter notes where available. "
+    "Return a JSON object with keys topic (a few words), region (geographic focus, or \"Global\"), "
+    f"purpose (one of {', '.join(DECK_PURPOSES)}) and deck_summary (the entire deck in under 100 words)."
+)
+
+
+# Outermost {...} in a reply, so ```json fences or a sentence of prose around it don't break parsing
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def _extract_json(raw: str) -> str:
+    m = _JSON_RE.search(raw)
+    return m.group(0) if m else raw
+
+
+def _parse_deck_context(raw: str) -> Dict[str, str]:
+    """Validated topic/region/purpose/deck_summary; an unparseable reply becomes the summary"""
+    try:
+        context = json.loads(_extract_json(raw))
+    except ValueError:
+        context = None
+    if not isinstance(context, dict):
+        return {"topic": "Unknown", "region": "Unknown", "purpose": "inform", "deck_summary": raw}
+    
+    purpose = str(context.get("purpose") or "").strip().lower()
+    return {
+        "topic": str(context.get("topic") or "Unknown").strip(),
+        "region": str(context.get("region") or "Unknown").strip(),
+        "purpose": purpose if purpose in DECK_PURPOSES else "inform",
+        "deck_summary": str(context.get("deck_summary") or "").strip() or raw,
+    }
+
+
+BATCH_SYSTEM_PROMPT = (
+    "Summarize each slide in ≤40 words, incorporating insights from the presenter notes where given. "
+    'Return a JSON object {"slides": [...]} with one object per slide, each with the keys '
+    '"slide" (the number in brackets) and "summary".'
+)
+
+
+def _batch_prompt(slides_chunk: List[Tuple[int, str]]) -> str:
+    """Pack several (slide number, segment) pairs into one user message"""
+    return "SLIDES:\n" + "\n\n".join(segment for _, segment in slides_chunk)
+
+
+def _parse_batch(raw: str) -> Dict[int, str]:
+    """Per-slide summaries from a batch reply, keyed on slide number; empty if the reply is malformed"""
+    by_number = {}
+    try:
+        items = json.loads(_extract_json(raw))["slides"]
+    except (ValueError, KeyError, TypeError):
+        return by_number
+    # Keyed on number so a skipped or reordered entry can't shift summaries onto the wrong slide;
+    # a bad entry only loses its own slide
+    for item in items if isinstance(items, list) else []:
+        try:
+            by_number[int(item["slide"])] = str(item["summary"]).strip()
+        except (ValueError, KeyError, TypeError):
+            continue
+    return by_number
+
+
+# Not st.cache_data: that would pin "Error: …" summaries process-wide. Successful
+# temperature-0 replies are already served from the LLM reply cache on a repeat run.
 def summarize_deck(slides_data: List[Dict[str, Any]]):
     """Generate summaries with slide content and notes"""
-    # Prepare content for overall deck summary
-    deck_content = []
-    for data in slides_data:
-        if data["has_notes"]:
-            deck_content.append(f"Slide {data['slide_number']} content:\n{data['slide_text']}\n\nSlide {data['slide_number']} notes:\n{data['notes_text']}")
-        else:
-            deck_content.append(f"Slide {data['slide_number']} content:\n{data['slide_text']}")
+    return asyncio.run(summarize_deck_async(slides_data))
+
+
+def _slide_segment(number: int, text: str, notes: Optional[str]) -> str:
+    segment = f"[{number}] Slide content:\n{text}"
+    return segment + f"\n\nPresenter notes:\n{notes}" if notes else segment
+
+
+def _prepare_slides(slides_data: List[Dict[str, Any]]) -> Tuple[str, List[Tuple[int, str]]]:
+    """Format each slide once; return the deck-summary prompt and (slide number, clipped segment) pairs"""
+    deck_segments = []
+    slide_segments = []
+    for data in dedup_deck(slides_data):
+        number, text = data["slide_number"], data["slide_text"]
+        notes = data["notes_text"] if data["has_notes"] else None
+        segment = _slide_segment(number, text, notes)
+        deck_segments.append(segment)
+        # Most slides fit the per-slide limit, so their deck segment is reused as is
+        if len(text) > SLIDE_PROMPT_CHARS:
+            segment = _slide_segment(number, clip_text(text, SLIDE_PROMPT_CHARS), notes)
+        slide_segments.append((number, segment))
+    return "\n\n".join(deck_segments), slide_segments
+
+
+async def summarize_deck_async(slides_data: List[Dict[str, Any]]):
+    """Issue the deck summary and batched per-slide summaries concurrently"""
+    deck_prompt, slide_segments = _prepare_slides(slides_data)
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    async with get_async_client() as client:
+        async def bounded_chat(system: str, user: str, temperature: float = 0.3,
+                               json_mode: bool = False) -> str:
+            async with sem:
+                return await achat(client, system, user, temperature, json_mode)
+
+        async def process_slide(segment: str) -> str:
+            return await bounded_chat(
+                "Summarize this slide in ≤40 words. Incorporate insights from the presenter notes where given.",
+                segment,
+                temperature=0,
+            )
+
+        async def summarize_batch(slides_chunk: List[Tuple[int, str]]) -> List[str]:
+            raw = await bounded_chat(BATCH_SYSTEM_PROMPT, _batch_prompt(slides_chunk),
+                                     temperature=0, json_mode=True)
+            if raw.startswith("Error:"):
+                return [raw] * len(slides_chunk)
+            by_number = _parse_batch(raw)
+            # Only slides the reply left out fall back to one call per slide
+            missing = [(number, segment) for number, segment in slides_chunk if not by_number.get(number)]
+            retried = await asyncio.gather(*(process_slide(segment) for _, segment in missing))
+            by_number.update(zip((number for number, _ in missing), retried))
+            return [by_number[number] for number, _ in slides_chunk]
+
+        # Deck context and summary come from one call, sent alongside the per-slide batches
+        deck_raw, *batches = await asyncio.gather(
+            bounded_chat(DECK_SYSTEM_PROMPT, deck_prompt, temperature=0, json_mode=True),
+            *(summarize_batch(chunk) for chunk in _chunked(slide_segments, SLIDE_BATCH_SIZE)),
+        )
     
-    # Generate overall deck summary
-    deck_summary = chat(
-        "You are an expert presentation analyst. Summarize the entire deck in under 100 words. "
-        "Use insights from the presenter notes where available.",
-        "\n\n".join(deck_content),
+    slide_summaries = [summary for batch in batches for summary in batch]
+    return _parse_deck_context(deck_raw), slide_summaries
+
+
+BATCH_JOB_DONE = ("completed", "failed", "expired", "cancelled")
+
+
+def submit_batch_job(slides_data: List[Dict[str, Any]], deck_hash: str) -> bool:
+    """Submit summarize_deck's prompts as one Azure OpenAI Batch job, tracked in st.session_state.batch_job"""
+    client = get_client()
+    deck_prompt, slide_segments = _prepare_slides(slides_data)
+    chunks = list(_chunked(slide_segments, SLIDE_BATCH_SIZE))
+    bodies = {"deck": _chat_body(DECK_SYSTEM_PROMPT, deck_prompt, temperature=0, json_mode=True,
+                                 model=BATCH_MODEL)}
+    for i, chunk in enumerate(chunks):
+        bodies[f"chunk_{i}"] = _chat_body(BATCH_SYSTEM_PROMPT, _batch_prompt(chunk),
+                                          temperature=0, json_mode=True, model=BATCH_MODEL)
+    jsonl = "\n".join(
+        json.dumps({"custom_id": cid, "method": "POST", "url": "/chat/completions", "body": body})
+        for cid, body in bodies.items()
     )
     
-    # Generate per-slide summaries
-    slide_summaries = []
-    for data in slides_data:
-        if data["has_notes"]:
-            content = f"Slide content: {data['slide_text']}\n\nPresenter notes: {data['notes_text']}"
-            system_prompt = "Summarize this slide in ≤40 words. Incorporate insights from the presenter notes."
-        else:
-            content = data['slide_text']
-            system_prompt = "Summarize this slide in ≤40 words."
-        
-        summary = chat(system_prompt, content, temperature=0.2)
-        slide_summaries.append(summary)
+    try:
+        with st.spinner("Submitting batch job…"):
+            batch_file = client.files.create(file=("slides.jsonl", jsonl.encode()), purpose="batch")
+            job = client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/chat/completions",
+                completion_window="24h",
+            )
+    except Exception as e:
+        st.error(f"Batch job failed: {e}")
+        return False
+    
+    # Kept across reruns: a widget click stops the script, and the next run resumes polling this job
+    st.session_state.batch_job = {
+        "id": job.id,
+        "deck": deck_hash,
+        "chunks": [[number for number, _ in chunk] for chunk in chunks],
+    }
+    return True
+
+
+def collect_batch_job():
+    """Summaries from the tracked batch job, or None while it is still running or once it has failed"""
+    tracked = st.session_state.batch_job
+    client = get_client()
+    with st.status("Checking batch job…") as status:
+        try:
+            job = client.batches.retrieve(tracked["id"])
+            if job.status not in BATCH_JOB_DONE:
+                done = f" ({job.request_counts.completed}/{job.request_counts.total} requests)" if job.request_counts else ""
+                status.update(label=f"Batch job {job.status}{done}…")
+                return None
+            
+            if job.status != "completed" or not job.output_file_id:
+                del st.session_state.batch_job
+                status.update(label=f"Batch job {job.status}", state="error")
+                st.error(f"Batch job {job.id} ended with status '{job.status}'.")
+                return None
+            output = client.files.content(job.output_file_id).text
+        except Exception as e:
+            # The job id is kept, so the next poll tries again
+            status.update(label="Could not reach the batch job", state="error")
+            st.error(f"Batch job check failed: {e}")
+            return None
+        status.update(label="Batch job completed", state="complete")
+    
+    # Output lines arrive in any order; custom_id maps them back to the deck or a chunk of slides
+    replies = {}
+    for line in output.splitlines():
+        try:
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if response.get("status_code") == 200:
+                replies[item["custom_id"]] = response["body"]["choices"][0]["message"]["content"].strip()
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            # Blank or malformed line: only the deck/chunk it belongs to is reported missing
+            continue
+    del st.session_state.batch_job
     
-    return deck_summary, slide_summaries
+    missing = "Error: no result in batch output"
+    slide_summaries = []
+    for i, numbers in enumerate(tracked["chunks"]):
+        by_number = _parse_batch(replies.get(f"chunk_{i}", ""))
+        slide_summaries.extend(by_number.get(number) or missing for number in numbers)
+    return _parse_deck_context(replies.get("deck", missing)), slide_summaries
+
+
+def cancel_batch_job() -> None:
+    job_id = st.session_state.pop("batch_job")["id"]
+    try:
+        get_client().batches.cancel(job_id)
+    except Exception as e:
+        st.error(f"Could not cancel batch job {job_id}: {e}")
 
 # ────────────────────────────────────────────────
 # 🎛️ Streamlit UI
@@ -199,6 +637,11 @@ def main():
     st.set_page_config("PPT Summarizer & Image Assistant", layout="wide")
     st.title("📊 PPT Summarizer & Image Assistant")
 
+    # Kick off the connection check now; the sidebar renders while it runs, and the
+    # uploader only appears once it has passed
+    if AZURE_API_KEY and AZURE_ENDPOINT:
+        deployments_future()
+
     # Show configuration status
     with st.sidebar:
         st.subheader("📌 Azure OpenAI Configuration")
@@ -217,6 +660,10 @@ def main():
             st.error("❌ AZURE_OPENAI_ENDPOINT is not set")
         else:
             st.success("✅ Endpoint is set")
+        
+        llm_cache = get_llm_cache()
+        st.caption(f"LLM reply cache: {len(llm_cache['replies'])} entries, "
+                   f"{llm_cache['hits']} hits / {llm_cache['misses']} misses")
             
         # Debug button to show available deployments
         if st.button("🔍 Show Available Deployments"):
@@ -272,24 +719,61 @@ def main():
         return
 
     # Extract slide data (both text and notes)
-    slides_data = extract_slide_data(file)
+    ppt_bytes = file.getvalue()
+    slides_data = extract_slide_data(ppt_bytes)
+    
+    # A job submitted for another deck must not have its summaries shown for this one
+    deck_hash = hashlib.blake2b(ppt_bytes, digest_size=16).hexdigest()
+    if "batch_job" in st.session_state and st.session_state.batch_job["deck"] != deck_hash:
+        cancel_batch_job()
+        st.info("A different deck was uploaded, so the previous batch job was cancelled.")
     
     # Show notes statistics
     slides_with_notes = sum(1 for slide in slides_data if slide["has_notes"])
     st.info(f"Found {len(slides_data)} slides, {slides_with_notes} with presenter notes.")
 
+    batch_mode = st.toggle(
+        "Batch mode (cheaper, slower)",
+        disabled=not BATCH_JOB_API,
+        help="Runs the analysis as an Azure OpenAI Batch job at about half the cost; it can take several minutes. "
+             "Requires AZURE_OPENAI_API_VERSION 2024-07-01-preview or later and a Global Batch deployment.",
+    )
+
     # Generate summaries
-    if st.button("🚀 Generate Summaries") or "summaries" in st.session_state:
+    if st.button("🚀 Generate Summaries") or "summaries" in st.session_state or "batch_job" in st.session_state:
         if "summaries" not in st.session_state:
-            with st.spinner("Calling Azure OpenAI…"):
-                st.session_state.summaries = summarize_deck(slides_data)
+            # A job submitted on an earlier run is resumed rather than submitted again
+            if "batch_job" in st.session_state or batch_mode:
+                if "batch_job" not in st.session_state and not submit_batch_job(slides_data, deck_hash):
+                    return
+                summaries = collect_batch_job()
+                if summaries is None:
+                    if "batch_job" in st.session_state:
+                        if st.button("✖️ Cancel batch job"):
+                            cancel_batch_job()
+                            st.rerun()
+                        time.sleep(BATCH_JOB_POLL_SECONDS)
+                        st.rerun()
+                    return
+                st.session_state.summaries = summaries
+            else:
+                with st.spinner("Calling Azure OpenAI…"):
+                    st.session_state.summaries = summarize_deck(slides_data)
 
         deck, per_slide = st.session_state.summaries
         st.subheader("Overall Deck Summary")
-        st.write(deck)
+        st.caption(f"Topic: {deck['topic']} · Region: {deck['region']} · Purpose: {deck['purpose']}")
+        st.write(deck["deck_summary"])
         st.divider()
         st.subheader("Per-Slide Summaries & Illustrations")
 
+        if st.button("🎨 Generate all images"):
+            with st.spinner(f"Generating {len(per_slide)} images…"):
+                results = asyncio.run(gen_all(per_slide))
+            for idx, (prompt, url) in enumerate(results):
+                st.session_state[f"img{idx}"] = url
+                st.session_state[f"prompt{idx}"] = prompt
+
         for idx, (data, summ) in enumerate(zip(slides_data, per_slide)):
             with st.expander(f"Slide {data['slide_number']}"):
                 if data["has_notes"]:
@@ -311,14 +795,19 @@ def main():
                 c1, c2 = st.columns([1, 3])
                 with c1:
                     if st.button("🎨 Generate Image", key=f"btn{idx}"):
-                        prompt = chat(
-                            "Craft a vivid, photo-realistic DALL·E-3 prompt (16:9, minimal text). Return only the prompt.",
-                            f"Slide summary: {summ}",
-                            temperature=0.7,
-                        )
-                        with st.spinner("Generating image…"):
-                            st.session_state[f"img{idx}"] = dalle(prompt)
-                            st.session_state[f"prompt{idx}"] = prompt
+                        # Stream the prompt so there is something to read while it is written
+                        with c2:
+                            prompt = st.write_stream(chat_stream(
+                                IMAGE_PROMPT_SYSTEM,
+                                f"Slide summary: {summ}",
+                                temperature=0.7,
+                            )).strip()
+                        st.session_state[f"prompt{idx}"] = prompt
+                        st.session_state[f"img{idx}"] = None
+                        # Don't spend image RPM rendering an empty prompt or the error text
+                        if prompt and not prompt.startswith("Error:"):
+                            with st.spinner("Generating image…"):
+                                st.session_state[f"img{idx}"] = dalle(prompt)
                 with c2:
                     if url := st.session_state.get(f"img{idx}"):
                         st.image(url, use_column_width=True)
@@ -0,0 +1,68 @@
+# utils.py
+"""
+Shared helpers for the PPT summarizer: PowerPoint text and notes extraction,
+and trimming slide text before it is sent to the model.
+"""
+
+import math
+from collections import Counter
+from io import BytesIO
+from typing import List, Dict, Any
+import streamlit as st
+from pptx import Presentation
+
+
+def _shape_texts(shapes) -> List[str]:
+    """Stripped, non-empty text of each shape, reading each shape's text only once"""
+    texts = []
+    append = texts.append
+    for sh in shapes:
+        t = getattr(sh, "text", None)
+        if t and (s := t.strip()):
+            append(s)
+    return texts
+
+
+# Keyed on the file bytes so reruns of an unchanged upload skip re-parsing
+@st.cache_data(show_spinner=False, max_entries=4)
+def extract_slide_data(ppt_bytes: bytes) -> List[Dict[str, Any]]:
+    """Extract both slide text and notes from PowerPoint"""
+    prs = Presentation(BytesIO(ppt_bytes))
+    slides_data = []
+    append = slides_data.append
+    
+    for i, slide in enumerate(prs.slides, 1):
+        # has_notes_slide avoids creating an empty notes slide just to look at it
+        notes_text = "\n".join(_shape_texts(slide.notes_slide.shapes)) if slide.has_notes_slide else ""
+        
+        append({
+            "slide_number": i,
+            "slide_text": "\n".join(_shape_texts(slide.shapes)),
+            "notes_text": notes_text,
+            "has_notes": bool(notes_text)
+        })
+    
+    return slides_data
+
+
+def dedup_deck(slides_data: List[Dict[str, Any]], share: float = 0.3) -> List[Dict[str, Any]]:
+    """Copy of slides_data without slide-text lines found on at least `share` of the slides (footers, repeated headers)"""
+    # A line has to recur on 3+ slides before it counts, so short decks keep their titles
+    threshold = max(3, math.ceil(share * len(slides_data)))
+    counts = Counter(
+        line for data in slides_data
+        for line in {l.strip() for l in data["slide_text"].splitlines()} if line
+    )
+    boilerplate = {line for line, n in counts.items() if n >= threshold}
+    if not boilerplate:
+        return slides_data
+    
+    return [
+        {**data, "slide_text": "\n".join(l for l in data["slide_text"].splitlines() if l.strip() not in boilerplate)}
+        for data in slides_data
+    ]
+
+
+def clip_text(text: str, limit: int) -> str:
+    """Truncate text to about `limit` characters, marking the cut with an ellipsis"""
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"